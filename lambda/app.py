@@ -1,96 +1,220 @@
 import os
-import json
+import orjson
 import boto3
+from boto3.s3.transfer import TransferConfig
 import logging
+import re
 import uuid
+import hmac
+import hashlib
+import base64
 import requests
-from linebot import LineBotApi, WebhookParser
-from linebot.exceptions import InvalidSignatureError
-from linebot.models import (
-    MessageEvent, TextMessage, TextSendMessage,
-    FileMessage
-)
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from botocore.config import Config
 
-# Configure logging
+# Configure logging (override the level with LOG_LEVEL, e.g. INFO or DEBUG)
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'WARNING').upper())
+
+# Set LOG_FULL_EVENT to log the full event payload (at INFO) for debugging
+LOG_FULL_EVENT = os.environ.get('LOG_FULL_EVENT', '').strip().lower() in ('true', '1', 'yes')
+
+# Configuration, read once at import time so missing settings fail on cold start
+_SECRET_NAME = os.environ['SECRET_NAME']
+_BUCKET = os.environ['UPLOAD_BUCKET_NAME']
+_CONTENT_URL = 'https://api-data.line.me/v2/bot/message/{}/content'
+_WEBHOOK_SOURCE = os.environ.get('WEBHOOK_SOURCE', 'function_url')  # 'function_url' or 'apigw'
+
+# Initialize AWS clients with TCP keep-alive so connections stay warm across invocations
+boto_config = Config(tcp_keepalive=True, retries={'max_attempts': 2, 'mode': 'standard'})
+s3 = boto3.client('s3', config=boto_config)
+
+# Upload large files to S3 in concurrent 8 MB multipart chunks. The LINE
+# content stream isn't seekable, so s3transfer holds up to
+# max_in_memory_upload_chunks parts in memory, plus the part being read from
+# the stream: about 40 MB per upload
+_XFER = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True
+)
+# boto3's TransferConfig doesn't accept this as an argument, but s3transfer
+# reads the attribute
+_XFER.max_in_memory_upload_chunks = 4
+
+# Media types whose subtype is used as the file extension (e.g. image/png -> png)
+_SUBTYPE_EXTENSION_TYPES = frozenset(('image', 'audio', 'video'))
+
+# File extensions for other known media types; anything else is stored as .bin
+_FILE_EXTENSIONS = {
+    'application/pdf': 'pdf',
+}
+
+# Characters stripped from uploaded file names (anything but word characters and '-')
+_UNSAFE_NAME_CHARS = re.compile(r'[^\w-]+')
+
+# Reuse one HTTP session for Line content downloads to keep the TLS connection warm
+_LINE_SESSION = requests.Session()
+_LINE_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# Worker threads for handling the events of a webhook call concurrently
+_POOL = ThreadPoolExecutor(max_workers=4)
+
+# At most two file uploads run at once, so streamed upload buffers stay around
+# 2 x 40 MB (see _XFER) however many file events arrive in one webhook call
+_UPLOAD_SLOTS = threading.BoundedSemaphore(2)
+
+# Secrets are served from the local cache of the AWS Parameters and Secrets
+# Lambda Extension instead of calling Secrets Manager directly
+SECRETS_EXTENSION_URL = 'http://localhost:2773/secretsmanager/get'
 
-# Initialize AWS clients
-secretsmanager = boto3.client('secretsmanager')
-s3 = boto3.client('s3')
+# Line Bot clients, initialized once per container and reused across warm starts
+_LINE_BOT_API = None
+_CHANNEL_SECRET = None
+_TOKEN = None
 
-# Get secrets from AWS Secrets Manager
+# Static responses, built once per container; the runtime only reads them
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_RESP_OK = {
+    'statusCode': 200,
+    'body': orjson.dumps({'message': 'OK'}).decode(),
+    'headers': _JSON_HEADERS
+}
+_RESP_MISSING = {
+    'statusCode': 400,
+    'body': orjson.dumps({'message': 'Missing x-line-signature header'}).decode(),
+    'headers': _JSON_HEADERS
+}
+_RESP_BAD_SIG = {
+    'statusCode': 400,
+    'body': orjson.dumps({'message': 'Invalid signature'}).decode(),
+    'headers': _JSON_HEADERS
+}
+
+# Get secrets from AWS Secrets Manager via the Parameters and Secrets Lambda Extension
 def get_secret():
-    secret_name = os.environ['SECRET_NAME']
     try:
-        response = secretsmanager.get_secret_value(SecretId=secret_name)
-        secret = json.loads(response['SecretString'])
-        return secret
+        response = requests.get(
+            SECRETS_EXTENSION_URL,
+            params={'secretId': _SECRET_NAME},
+            headers={'X-Aws-Parameters-Secrets-Token': os.environ['AWS_SESSION_TOKEN']},
+            timeout=5
+        )
+        response.raise_for_status()
+        return orjson.loads(orjson.loads(response.content)['SecretString'])
     except Exception as e:
         logger.error(f"Error retrieving secret: {e}")
         raise e
 
-# Initialize Line Bot API with credentials from Secrets Manager
+# Load Line Bot credentials from Secrets Manager. They are only kept once both
+# are set, so a container started before the secret is filled in picks up the
+# credentials on the next invocation
+def _init():
+    global _CHANNEL_SECRET, _TOKEN
+    if _TOKEN is None:
+        secret = get_secret()
+        channel_access_token = secret.get('CHANNEL_ACCESS_TOKEN', '')
+        channel_secret = secret.get('CHANNEL_SECRET', '')
+        if not channel_access_token or not channel_secret:
+            logger.error("Line Bot credentials are not set in the secret yet")
+            return
+        _CHANNEL_SECRET = channel_secret
+        _TOKEN = channel_access_token
+
+# Run initialization during the Lambda init phase; on failure, the handler
+# retries it so the error surfaces on the first invocation
+try:
+    _init()
+except Exception as e:
+    logger.error(f"Error initializing Line Bot credentials: {e}")
+
+# Create the Line Bot API client on first use. Importing linebot loads all of
+# its models and the async client, which invocations without events to reply
+# to (invalid signatures, webhook verification) never need
 def get_line_bot_api():
-    secret = get_secret()
-    channel_access_token = secret.get('CHANNEL_ACCESS_TOKEN', '')
-    channel_secret = secret.get('CHANNEL_SECRET', '')
-    line_bot_api = LineBotApi(channel_access_token)
-    parser = WebhookParser(channel_secret)
-    return line_bot_api, parser, channel_access_token
+    global _LINE_BOT_API
+    if _LINE_BOT_API is None:
+        from line_client import create_line_bot_api
+        _LINE_BOT_API = create_line_bot_api(_TOKEN)
+    return _LINE_BOT_API
+
+# Get the signature from function URL (payload v2) headers, which are always lowercase
+def _get_signature_lowercase(headers):
+    return headers.get('x-line-signature')
+
+# Get the signature from API Gateway REST (payload v1) headers, which keep the
+# client's casing
+def _get_signature_any_case(headers):
+    signature = headers.get('x-line-signature') or headers.get('X-Line-Signature')
+    if signature is None:
+        signature = next((v for k, v in headers.items() if k and k.lower() == 'x-line-signature'), None)
+    return signature
+
+# The payload shape is fixed per deployment, so pick the header lookup once
+_get_signature = _get_signature_any_case if _WEBHOOK_SOURCE == 'apigw' else _get_signature_lowercase
+
+# Verify the Line signature: base64-encoded HMAC-SHA256 of the raw body
+def verify_signature(body, signature, channel_secret):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    mac = hmac.new(channel_secret.encode('utf-8'), body, hashlib.sha256).digest()
+    # Compare bytes: compare_digest rejects str with non-ASCII characters
+    return hmac.compare_digest(base64.b64encode(mac), signature.encode('utf-8'))
 
 # Handle file upload from Line Bot
 def handle_file_upload(line_bot_api, message_id, channel_access_token, file_name=None):
     try:
-        # Get the S3 bucket name from environment variable
-        bucket_name = os.environ['UPLOAD_BUCKET_NAME']
+        bucket_name = _BUCKET
         
         # Get file content from Line Message API
-        url = f'https://api-data.line.me/v2/bot/message/{message_id}/content'
+        url = _CONTENT_URL.format(message_id)
         headers = {'Authorization': f'Bearer {channel_access_token}'}
         
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to get file content: {response.status_code} {response.text}")
-            return None
+        # Stream the response so the file is never fully buffered in memory
+        with _UPLOAD_SLOTS, _LINE_SESSION.get(url, headers=headers, stream=True, timeout=(3, 30)) as response:
+            if response.status_code != 200:
+                logger.error(f"Failed to get file content: {response.status_code} {response.text}")
+                return None
         
-        # Generate a unique filename while preserving original name
-        content_type = response.headers.get('Content-Type', '')
+            # Generate a unique filename while preserving original name
+            content_type = response.headers.get('Content-Type', '')
         
-        # Get original filename or use a default name based on content type
-        original_filename = file_name if file_name else 'file'
+            # Get original filename or use a default name based on content type
+            original_filename = file_name if file_name else 'file'
         
-        # Remove file extension from original filename if present
-        if '.' in original_filename:
-            original_name = original_filename.rsplit('.', 1)[0]
-        else:
-            original_name = original_filename
+            # Remove file extension from original filename if present
+            if '.' in original_filename:
+                original_name = original_filename.rsplit('.', 1)[0]
+            else:
+                original_name = original_filename
             
-        # Clean the filename to remove any potentially problematic characters
-        original_name = ''.join(c for c in original_name if c.isalnum() or c in '-_')
+            # Clean the filename to remove any potentially problematic characters
+            original_name = _UNSAFE_NAME_CHARS.sub('', original_name)
         
-        # Set file extension based on content type
-        file_extension = 'bin'  # Default extension
-        if 'image' in content_type:
-            file_extension = content_type.split('/')[1]
-        elif 'audio' in content_type:
-            file_extension = content_type.split('/')[1]
-        elif 'video' in content_type:
-            file_extension = content_type.split('/')[1]
-        elif 'application/pdf' in content_type:
-            file_extension = 'pdf'
+            # Set file extension based on content type, ignoring parameters
+            # and structured syntax suffixes (e.g. image/svg+xml -> svg)
+            media_type = content_type.split(';', 1)[0].strip().lower()
+            main_type, _, sub_type = media_type.partition('/')
+            if main_type in _SUBTYPE_EXTENSION_TYPES and sub_type:
+                file_extension = sub_type.split('+', 1)[0]
+            else:
+                file_extension = _FILE_EXTENSIONS.get(media_type, 'bin')
         
-        # Create filename with original name and UUID for uniqueness
-        filename = f"{uuid.uuid4().hex[:8]}_{original_name}.{file_extension}"
+            # Create filename with original name and UUID for uniqueness
+            filename = f"{uuid.uuid4().hex[:8]}_{original_name}.{file_extension}"
         
-        # Upload file to S3
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=filename,
-            Body=response.content,
-            ContentType=content_type
-        )
+            # Upload file to S3, streaming the body in multipart chunks
+            response.raw.decode_content = True
+            s3.upload_fileobj(
+                response.raw,
+                bucket_name,
+                filename,
+                ExtraArgs={'ContentType': content_type},
+                Config=_XFER
+            )
         
         logger.info(f"File uploaded to S3: {bucket_name}/{filename}")
         return f"s3://{bucket_name}/{filename}"
@@ -99,101 +223,105 @@ def handle_file_upload(line_bot_api, message_id, channel_access_token, file_name
         logger.error(f"Error handling file upload: {e}")
         return None
 
+# Handle a single Line webhook event
+def handle_event(line_bot_api, event_obj, channel_access_token):
+    # Already loaded by get_line_bot_api(), so this is only a module lookup
+    from linebot.models import TextSendMessage
+    
+    try:
+        reply_token = event_obj.get('replyToken')
+        
+        if event_obj.get('type') == 'message':
+            message = event_obj.get('message', {})
+            
+            # Handle text messages
+            if message.get('type') == 'text':
+                user_message = message.get('text')
+                
+                # Echo the message back to the user
+                line_bot_api.reply_message(
+                    reply_token,
+                    TextSendMessage(text=f"You said: {user_message}")
+                )
+            
+            # Handle file messages
+            elif message.get('type') == 'file':
+                message_id = message.get('id')
+                file_name = message.get('fileName')
+                file_size = message.get('fileSize')
+                
+                logger.info(f"Received file: {file_name}, size: {file_size}")
+                
+                # Upload file to S3
+                s3_path = handle_file_upload(line_bot_api, message_id, channel_access_token, file_name)
+                
+                if s3_path:
+                    # Reply with success message
+                    line_bot_api.reply_message(
+                        reply_token,
+                        TextSendMessage(text=f"File '{file_name}' uploaded successfully!")
+                    )
+                else:
+                    # Reply with error message
+                    line_bot_api.reply_message(
+                        reply_token,
+                        TextSendMessage(text=f"Sorry, there was an error processing your file.")
+                    )
+    except Exception as e:
+        logger.error(f"Error processing event: {str(e)}")
+
 # Lambda handler function
 def handler(event, context):
     # Log the event for debugging
-    logger.info(f"Event: {json.dumps(event)}")
+    if LOG_FULL_EVENT and logger.isEnabledFor(logging.INFO):
+        logger.info(f"Event: {orjson.dumps(event).decode()}")
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Event keys: %s", list(event.keys()))
     
-    # Get Line Bot credentials
-    line_bot_api, webhook_parser, channel_access_token = get_line_bot_api()
+    # Get Line Bot credentials (no-op once initialized)
+    _init()
+    # Without credentials every signature check fails, as with an empty channel secret
+    channel_secret, channel_access_token = _CHANNEL_SECRET or '', _TOKEN
     
-    # Extract headers from the event
-    headers = event.get('headers', {}) or {}
-    
-    # Get the signature from headers (case-insensitive)
-    signature = None
-    for key, value in headers.items():
-        if key and key.lower() == 'x-line-signature':
-            signature = value
-            break
+    # Get the signature from the event headers
+    signature = _get_signature(event.get('headers') or {})
     
     # Parse request body
     body_str = event.get('body', '{}')
     
-    # Verify the signature
+    # Verify the signature before parsing the body
     try:
         if not signature:
             logger.error("Missing x-line-signature header")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': 'Missing x-line-signature header'}),
-                'headers': {'Content-Type': 'application/json'}
-            }
+            return _RESP_MISSING
+        
+        if not verify_signature(body_str, signature, channel_secret):
+            logger.error(f"Invalid signature: {signature}")
+            return _RESP_BAD_SIG
         
-        # Use Line Bot SDK's WebhookParser to verify the signature
-        events = webhook_parser.parse(body_str, signature)
+        events = orjson.loads(body_str).get('events', [])
         logger.info("Signature verification successful")
-    except InvalidSignatureError:
-        logger.error(f"Invalid signature: {signature}")
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'message': 'Invalid signature'}),
-            'headers': {'Content-Type': 'application/json'}
-        }
     except Exception as e:
         logger.error(f"Error parsing webhook: {str(e)}")
         return {
             'statusCode': 500,
-            'body': json.dumps({'message': f'Error: {str(e)}'}),
-            'headers': {'Content-Type': 'application/json'}
+            'body': orjson.dumps({'message': f'Error: {str(e)}'}).decode(),
+            'headers': _JSON_HEADERS
         }
     
-    # Process Line webhook events
+    # Process Line webhook events concurrently; replies and file uploads are
+    # independent blocking HTTP calls
     try:
-        for event_obj in events:
-            reply_token = event_obj.reply_token
-            
-            if isinstance(event_obj, MessageEvent):
-                # Handle text messages
-                if isinstance(event_obj.message, TextMessage):
-                    user_message = event_obj.message.text
-                    
-                    # Echo the message back to the user
-                    line_bot_api.reply_message(
-                        reply_token,
-                        TextSendMessage(text=f"You said: {user_message}")
-                    )
-                
-                # Handle file messages
-                elif isinstance(event_obj.message, FileMessage):
-                    message_id = event_obj.message.id
-                    file_name = event_obj.message.file_name
-                    file_size = event_obj.message.file_size
-                    
-                    logger.info(f"Received file: {file_name}, size: {file_size}")
-                    
-                    # Upload file to S3
-                    s3_path = handle_file_upload(line_bot_api, message_id, channel_access_token, file_name)
-                    
-                    if s3_path:
-                        # Reply with success message
-                        line_bot_api.reply_message(
-                            reply_token,
-                            TextSendMessage(text=f"File '{file_name}' uploaded successfully!")
-                        )
-                    else:
-                        # Reply with error message
-                        line_bot_api.reply_message(
-                            reply_token,
-                            TextSendMessage(text=f"Sorry, there was an error processing your file.")
-                        )
+        if not events:
+            return _RESP_OK
+        line_bot_api = get_line_bot_api()
+        list(_POOL.map(
+            lambda event_obj: handle_event(line_bot_api, event_obj, channel_access_token),
+            events
+        ))
     except Exception as e:
         logger.error(f"Error processing events: {str(e)}")
         # Continue processing - don't fail the webhook
     
     # Return successful response
-    return {
-        'statusCode': 200,
-        'body': json.dumps({'message': 'OK'}),
-        'headers': {'Content-Type': 'application/json'}
-    }
+    return _RESP_OK
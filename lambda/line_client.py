@@ -0,0 +1,50 @@
+# Line Bot SDK client setup. Kept out of app.py so that importing linebot
+# (and every model it eagerly loads) only happens once a reply is sent
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from linebot import LineBotApi
+from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
+
+# Pooled session for Line Messaging API calls, retrying on gateway errors
+_LINE_API_SESSION = requests.Session()
+_LINE_API_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504], allowed_methods=['POST'])
+))
+
+# Line Bot SDK HTTP client that sends requests through the pooled session;
+# the SDK's default client opens a new connection for every request
+class SessionHttpClient(RequestsHttpClient):
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        response = _LINE_API_SESSION.get(
+            url, headers=headers, params=params, stream=stream,
+            timeout=self.timeout if timeout is None else timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        response = _LINE_API_SESSION.post(
+            url, headers=headers, data=data,
+            timeout=self.timeout if timeout is None else timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def delete(self, url, headers=None, data=None, timeout=None):
+        response = _LINE_API_SESSION.delete(
+            url, headers=headers, data=data,
+            timeout=self.timeout if timeout is None else timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        response = _LINE_API_SESSION.put(
+            url, headers=headers, data=data,
+            timeout=self.timeout if timeout is None else timeout
+        )
+        return RequestsHttpResponse(response)
+
+# Create a Line Bot API client that uses the pooled session
+def create_line_bot_api(channel_access_token):
+    return LineBotApi(channel_access_token, http_client=SessionHttpClient)
@@ -20,6 +20,9 @@ class LineBotLambdaOneclickStack(Stack):
         # Get existing bucket name from context if provided
         existing_bucket_name = self.node.try_get_context('bucket_name')
 
+        # Expose the webhook through API Gateway instead of a function URL if requested
+        use_apigw = str(self.node.try_get_context('use_apigw') or '').strip().lower() in ('true', '1', 'yes')
+
         # Create a secret for Line Bot credentials
         line_bot_secret = secretsmanager.Secret(
             self, "LineBotCredentials",
@@ -36,16 +39,31 @@ class LineBotLambdaOneclickStack(Stack):
             code=_lambda.Code.from_asset("lambda", 
                 bundling=BundlingOptions(
                     image=_lambda.Runtime.PYTHON_3_13.bundling_image,
+                    platform="linux/arm64",  # Install wheels for the ARM64 functions
+                    # boto3/botocore come with the Lambda runtime, so keep them (and
+                    # bundled test suites) out of the layer to reduce its size
                     command=[
                         "bash", "-c",
-                        "pip install -r requirements-layer.txt -t /asset-output/python && cp -r /asset-input/* /asset-output/"
+                        "pip install -r requirements-layer.txt -t /asset-output/python"
+                        " && cd /asset-output/python"
+                        " && rm -rf boto3 botocore s3transfer boto3-* botocore-* s3transfer-*"
+                        " && find . -type d -name tests -prune -exec rm -rf {} +"
                     ],
                 )
             ),
             compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+            compatible_architectures=[_lambda.Architecture.ARM_64],
             description="Layer containing Line Bot SDK and dependencies",
         )
 
+        # AWS Parameters and Secrets Lambda Extension: serves the secret from a
+        # local cache so the functions don't call Secrets Manager on every request
+        secrets_ext_layer = _lambda.ParamsAndSecretsLayerVersion.from_version(
+            _lambda.ParamsAndSecretsVersions.V1_0_103,
+            cache_size=1000,
+            secrets_manager_ttl=Duration.seconds(300),
+        )
+
         # Initialize file_upload_bucket variable
         file_upload_bucket = None
         bucket_name = ""
@@ -87,13 +105,17 @@ class LineBotLambdaOneclickStack(Stack):
         line_bot_lambda = _lambda.Function(
             self, "LineBotFunction",
             runtime=_lambda.Runtime.PYTHON_3_13,
+            architecture=_lambda.Architecture.ARM_64,  # Graviton2
             code=_lambda.Code.from_asset("lambda"),
             handler="app.handler",
             timeout=Duration.seconds(30),
+            memory_size=256,  # Runtime (~100 MB) plus two concurrent ~40 MB streamed uploads
             layers=[line_bot_layer],  # Attach the layer to the Lambda function
+            params_and_secrets=secrets_ext_layer,  # Attach the secrets extension layer
             environment={
                 "SECRET_NAME": line_bot_secret.secret_name,
                 "UPLOAD_BUCKET_NAME": bucket_name,
+                "WEBHOOK_SOURCE": "apigw" if use_apigw else "function_url",
             }
         )
 
@@ -103,71 +125,67 @@ class LineBotLambdaOneclickStack(Stack):
         # Grant Lambda function permission to write to S3 bucket
         file_upload_bucket.grant_read_write(line_bot_lambda)
 
-        # Create Lambda authorizer for API Gateway
-        line_authorizer_lambda = _lambda.Function(
-            self, "LineAuthorizerFunction",
-            runtime=_lambda.Runtime.PYTHON_3_13,
-            code=_lambda.Code.from_asset("lambda/authorizer"),
-            handler="authorizer.handler",
-            timeout=Duration.seconds(10),
-            layers=[line_bot_layer],  # Attach the layer to the authorizer
-            environment={
-                "SECRET_NAME": line_bot_secret.secret_name,
-            }
-        )
-
-        # Grant authorizer Lambda function permission to read the secret
-        line_bot_secret.grant_read(line_authorizer_lambda)
-
-        # Create API Gateway with Lambda authorizer
-        api = apigw.RestApi(
-            self, "LineBotApi",
-            description="API Gateway for Line Bot webhook",
-            deploy_options=apigw.StageOptions(
-                stage_name="prod",
-                throttling_rate_limit=10,
-                throttling_burst_limit=20
+        if use_apigw:
+            # Create API Gateway for the webhook
+            api = apigw.RestApi(
+                self, "LineBotApi",
+                description="API Gateway for Line Bot webhook",
+                deploy_options=apigw.StageOptions(
+                    stage_name="prod",
+                    throttling_rate_limit=10,
+                    throttling_burst_limit=20
+                )
             )
-        )
         
-        # Create Lambda authorizer with support for request parameters
-        authorizer = apigw.RequestAuthorizer(
-            self, "LineAuthorizer",
-            handler=line_authorizer_lambda,
-            identity_sources=[
-                "method.request.header.x-line-signature"
-            ],
-            results_cache_ttl=Duration.seconds(0)  # Disable caching for signature verification
-        )
+            # Reject requests without the x-line-signature header at API Gateway,
+            # so no authorizer Lambda is needed in front of the webhook
+            request_validator = apigw.RequestValidator(
+                self, "LineBotRequestValidator",
+                rest_api=api,
+                validate_request_parameters=True
+            )
         
-        # Create API Gateway resource and method
-        webhook_resource = api.root.add_resource("webhook")
-        webhook_method = webhook_resource.add_method(
-            "POST",
-            apigw.LambdaIntegration(
-                line_bot_lambda,
-                proxy=True,  # Use proxy integration to pass all request data
-                passthrough_behavior=apigw.PassthroughBehavior.WHEN_NO_TEMPLATES,
+            # Create API Gateway resource and method
+            webhook_resource = api.root.add_resource("webhook")
+            webhook_method = webhook_resource.add_method(
+                "POST",
+                apigw.LambdaIntegration(
+                    line_bot_lambda,
+                    proxy=True,  # Use proxy integration to pass all request data
+                    passthrough_behavior=apigw.PassthroughBehavior.WHEN_NO_TEMPLATES,
+                    request_parameters={
+                        "integration.request.header.x-line-signature": "method.request.header.x-line-signature"
+                    }
+                ),
+                request_validator=request_validator,
                 request_parameters={
-                    "integration.request.header.x-line-signature": "method.request.header.x-line-signature"
+                    "method.request.header.x-line-signature": True
                 }
-            ),
-            authorizer=authorizer,
-            authorization_type=apigw.AuthorizationType.CUSTOM,
-            request_parameters={
-                "method.request.header.x-line-signature": True
-            }
-        )
+            )
         
-        # Set the webhook URL
-        webhook_url = f"{api.url}webhook"
+            # Set the webhook URL
+            webhook_url = f"{api.url}webhook"
         
-        # Output the API Gateway URL
-        CfnOutput(
-            self, "LineBotWebhookUrl",
-            value=webhook_url,
-            description="API Gateway URL for Line Bot webhook"
-        )
+            # Output the API Gateway URL
+            CfnOutput(
+                self, "LineBotWebhookUrl",
+                value=webhook_url,
+                description="API Gateway URL for Line Bot webhook"
+            )
+        else:
+            # Expose the webhook through a Lambda function URL. Auth is NONE because
+            # the webhook Lambda verifies the Line signature itself
+            fn_url = line_bot_lambda.add_function_url(
+                auth_type=_lambda.FunctionUrlAuthType.NONE,
+                invoke_mode=_lambda.InvokeMode.BUFFERED
+            )
+            
+            # Output the function URL
+            CfnOutput(
+                self, "FnUrl",
+                value=fn_url.url,
+                description="Lambda function URL for Line Bot webhook"
+            )
 
         # Output instructions for setting up the secret
         CfnOutput(
@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import hmac
+import importlib.util
+import json
+import os
+
+import pytest
+
+LAMBDA_APP = os.path.join(os.path.dirname(__file__), "..", "..", "lambda", "app.py")
+
+
+@pytest.fixture(scope="module")
+def app():
+    # Load lambda/app.py under its own name; the top-level app.py is the CDK app
+    os.environ.setdefault("SECRET_NAME", "test-secret")
+    os.environ.setdefault("UPLOAD_BUCKET_NAME", "test-bucket")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location("lambda_app", LAMBDA_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sign(body, channel_secret):
+    mac = hmac.new(channel_secret.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(mac).decode("utf-8")
+
+
+def test_verify_signature_valid(app):
+    body = json.dumps({"events": []})
+    assert app.verify_signature(body, sign(body, "secret"), "secret")
+    assert app.verify_signature(body.encode("utf-8"), sign(body, "secret"), "secret")
+
+
+def test_verify_signature_invalid(app):
+    body = json.dumps({"events": []})
+    assert not app.verify_signature(body, sign(body, "other-secret"), "secret")
+    assert not app.verify_signature(body, "", "secret")
+
+
+def test_verify_signature_non_ascii(app):
+    body = json.dumps({"events": []})
+    assert not app.verify_signature(body, "é", "secret")
+
+
+def test_handler_rejects_non_ascii_signature(app, monkeypatch):
+    monkeypatch.setattr(app, "_TOKEN", "token")
+    monkeypatch.setattr(app, "_CHANNEL_SECRET", "secret")
+    event = {"headers": {"x-line-signature": "é"}, "body": json.dumps({"events": []})}
+    assert app.handler(event, None)["statusCode"] == 400
+
+
+def test_transfer_config_caps_in_memory_chunks(app):
+    # Runs against the real boto3, so an argument TransferConfig doesn't
+    # accept fails the module import here rather than the deployed function
+    from boto3.s3.transfer import TransferConfig
+
+    assert isinstance(app._XFER, TransferConfig)
+    assert app._XFER.max_in_memory_upload_chunks == 4
+
+
+def test_init_keeps_credentials_only_once_set(app, monkeypatch):
+    secrets = iter([
+        {"CHANNEL_ACCESS_TOKEN": "", "CHANNEL_SECRET": ""},
+        {"CHANNEL_ACCESS_TOKEN": "token", "CHANNEL_SECRET": "secret"},
+    ])
+    monkeypatch.setattr(app, "get_secret", lambda: next(secrets))
+    monkeypatch.setattr(app, "_TOKEN", None)
+    monkeypatch.setattr(app, "_CHANNEL_SECRET", None)
+
+    app._init()
+    assert app._TOKEN is None
+    assert app._CHANNEL_SECRET is None
+
+    app._init()
+    assert app._TOKEN == "token"
+    assert app._CHANNEL_SECRET == "secret"